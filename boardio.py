@@ -1,6 +1,19 @@
 import machine
 import asyncio
-import utime
+import micropython
+from micropython import const
+from utime import ticks_ms as _ticks_ms, ticks_diff as _ticks_diff, ticks_add as _ticks_add, sleep_ms as _sleep_ms
+
+# Module-level aliases so hot paths do a single global load instead of attribute lookups
+_IRQ_RISING = machine.Pin.IRQ_RISING
+_IRQ_FALLING = machine.Pin.IRQ_FALLING
+
+# Allow tracebacks from exceptions raised inside hard IRQ handlers
+micropython.alloc_emergency_exception_buf(100)
+
+_PENDING_MASK = const(31)  # IRQ ring buffer holds 32 pin ids
+_HEAD = const(0)  # Index of the read position in BoardIO._ring_idx
+_TAIL = const(1)  # Index of the write position in BoardIO._ring_idx
 
 class ButtonPin(machine.Pin):
     """
@@ -8,20 +21,21 @@ class ButtonPin(machine.Pin):
     """
     def __init__(self, pin, mode, pull, *, inverted=False):
         super().__init__(pin, mode, pull) 
-        self._inverted = inverted
+        self._xor = 1 if inverted else 0
+        # Native read bound once; hot paths and the ISR call it without allocating
+        self._raw = super().value
     
     def value(self):
         """
         Returns the pin value, inverted if specified during initialization.
         """
-        raw_value = super().value()
-        return not raw_value if self._inverted else raw_value
+        return self._raw() ^ self._xor
 
 class EdgeTriggerPin(ButtonPin):
     """
     Pin class with edge detection and callback support.
     Supports registering callbacks for rising and falling edges with optional debounce.
-    Can use either polling or hardware interrupts for edge detection.
+    Callbacks run either from a BoardIO watcher task (default) or via micropython.schedule (use_irq=True).
     """
     EDGE_RISING = 1
     EDGE_FALLING = 2
@@ -29,66 +43,143 @@ class EdgeTriggerPin(ButtonPin):
     
     def __init__(self, pin, mode, pull, *, inverted=False, debounce_ms=0, use_irq=False):
         super().__init__(pin, mode, pull, inverted=inverted)
-        self._callbacks = {
-            self.EDGE_RISING: [],
-            self.EDGE_FALLING: []
-        }
-        # Allow brief settle time for initial state
-        utime.sleep_ms(5)  # Brief delay to let pin stabilize
-        self._last_value = self.value()
+        self._cb_rising = []
+        self._cb_falling = []
+        # Edge tracking compares raw levels; inversion is applied only on dispatch
+        self._last_raw = self._raw()
         self._debounce_ms = debounce_ms
-        self._last_trigger_time = 0
+        # Earliest tick at which the next edge is accepted; starts in the past
+        self._next_allowed = _ticks_add(_ticks_ms(), -1)
         self._use_irq = use_irq
-        self._latched_value = None
-        
-        # Setup IRQ if requested
-        if use_irq:
-            trigger = 0
-            trigger |= machine.Pin.IRQ_RISING
-            trigger |= machine.Pin.IRQ_FALLING
-            self.irq(trigger=trigger, handler=self._irq_handler)
+        self._latched_raw = None
+        # Polled pins are read by a watcher task that a wake-only IRQ releases on each level change
+        self._wake_flag = None if use_irq else asyncio.ThreadSafeFlag()
+        # IRQ is armed lazily by add_callback, only for edges that have callbacks
+        self._irq_edges = 0
+        # Set by BoardIO.register_irq_pin when the pin is added to a group
+        self._sched = None
+        self._id = None
     
     def add_callback(self, edge_type, callback):
         """
         Register a callback function for the specified edge type.
         edge_type: EDGE_RISING, EDGE_FALLING, or EDGE_BOTH
-        callback: function to call when edge is detected
+        callback: function to call with the pin when edge is detected
+        On IRQ pins the callback runs in micropython.schedule context: keep it to setting
+        a ThreadSafeFlag or similarly trivial work. Polled pins call it from the watcher task.
         """
         if edge_type in (self.EDGE_RISING, self.EDGE_BOTH):
-            self._callbacks[self.EDGE_RISING].append(callback)
+            self._cb_rising.append(callback)
         if edge_type in (self.EDGE_FALLING, self.EDGE_BOTH):
-            self._callbacks[self.EDGE_FALLING].append(callback)
+            self._cb_falling.append(callback)
+        self._update_irq()
         return callback  # Return callback to allow use as decorator
     
     def remove_callback(self, callback):
         """
         Remove a callback function from all edge types.
         """
-        self._callbacks[self.EDGE_RISING] = [cb for cb in self._callbacks[self.EDGE_RISING] if cb != callback]
-        self._callbacks[self.EDGE_FALLING] = [cb for cb in self._callbacks[self.EDGE_FALLING] if cb != callback]
+        self._cb_rising = [cb for cb in self._cb_rising if cb != callback]
+        self._cb_falling = [cb for cb in self._cb_falling if cb != callback]
+        self._update_irq()
     
+    def _update_irq(self):
+        """
+        Program the hardware IRQ trigger to only the edges that have callbacks.
+        Debounced pins arm both edges so releases still refresh the debounce deadline.
+        Logical edges map to the opposite physical edge on inverted pins.
+        """
+        if not self._use_irq or self._sched is None:
+            return  # Armed once the pin is registered with a BoardIO
+        edges = 0
+        if self._cb_rising:
+            edges |= self.EDGE_RISING
+        if self._cb_falling:
+            edges |= self.EDGE_FALLING
+        if edges and self._debounce_ms:
+            # An unseen release would leave the deadline stale and let its bounce fire again
+            edges = self.EDGE_BOTH
+        if edges == self._irq_edges:
+            return
+        self._irq_edges = edges
+        if not edges:
+            self.irq(handler=None)
+            return
+        trigger = 0
+        if edges & (self.EDGE_FALLING if self._xor else self.EDGE_RISING):
+            trigger |= _IRQ_RISING
+        if edges & (self.EDGE_RISING if self._xor else self.EDGE_FALLING):
+            trigger |= _IRQ_FALLING
+        self.irq(trigger=trigger, handler=self._irq_handler, hard=True)
+    
+    @micropython.native
     def _irq_handler(self, pin):
         """
         IRQ handler - minimized to comply with MicroPython ISR rules.
-        Latches current pin value and schedules for processing outside the ISR.
+        Latches current raw pin level and queues the pin id for processing outside the ISR.
+        A pin is queued at most once per burst so bouncing cannot overflow the ring.
+        """
+        pending = self._latched_raw is not None
+        self._latched_raw = self._raw()  # Capture level at time of interrupt
+        if not pending:
+            self._sched(self._id)
+    
+    @micropython.native
+    def _deferred(self):
         """
-        self._latched_value = self.value()  # Capture value at time of interrupt
-        BoardIO.schedule_callback(self)
+        Debounce and dispatch a latched IRQ edge; called from BoardIO.process_pending_callbacks.
+        """
+        irq_state = machine.disable_irq()
+        latched = self._latched_raw
+        self._latched_raw = None
+        machine.enable_irq(irq_state)
+        if latched is None:
+            return
+        if self._irq_edges != self.EDGE_BOTH:
+            # Only one edge is armed (undebounced pin), so the pin left that level since the last IRQ
+            self._last_raw = latched ^ 1
+        
+        if self._debounce_ms:
+            # Confirm the level still matches the latched one before trusting it
+            current_raw = self._raw()
+            if current_raw != latched:
+                return
+        else:
+            current_raw = latched
+        if current_raw != self._last_raw:
+            current_time = _ticks_ms()
+            # Second test only runs on rejection: a deadline more than debounce_ms ahead is stale (ticks wrapped)
+            if (_ticks_diff(current_time, self._next_allowed) >= 0
+                    or _ticks_diff(self._next_allowed, current_time) > self._debounce_ms):
+                callbacks = self._cb_rising if current_raw ^ self._xor else self._cb_falling
+                for callback in callbacks:
+                    callback(self)
+                self._next_allowed = _ticks_add(current_time, self._debounce_ms)
+                self._last_raw = current_raw
     
+    def _wake_handler(self, pin):
+        """
+        IRQ handler for polled pins; only wakes the watcher task, which reads and dispatches.
+        """
+        self._wake_flag.set()
+    
+    @micropython.native
     def _poll_handler(self):
         """
         Handle edge detection and callbacks directly for polling mode.
         """
-        current_value = self.value()
-        if current_value != self._last_value:
-            current_time = utime.ticks_ms()
-            if self._debounce_ms == 0 or utime.ticks_diff(current_time, self._last_trigger_time) >= self._debounce_ms:
-                edge_type = self.EDGE_RISING if current_value else self.EDGE_FALLING
-                for callback in self._callbacks[edge_type]:
+        current_raw = self._raw()
+        if current_raw != self._last_raw:
+            current_time = _ticks_ms()
+            # Second test only runs on rejection: a deadline more than debounce_ms ahead is stale (ticks wrapped)
+            if (_ticks_diff(current_time, self._next_allowed) >= 0
+                    or _ticks_diff(self._next_allowed, current_time) > self._debounce_ms):
+                callbacks = self._cb_rising if current_raw ^ self._xor else self._cb_falling
+                for callback in callbacks:
                     callback(self)
-                self._last_trigger_time = current_time
-                # Only update last_value after successful debounce check
-                self._last_value = current_value
+                self._next_allowed = _ticks_add(current_time, self._debounce_ms)
+                # Only update last_raw after successful debounce check
+                self._last_raw = current_raw
 
 class PinGroup:
     """
@@ -97,100 +188,189 @@ class PinGroup:
     def __init__(self, board_io, group_name):
         self._board_io = board_io
         self._group_name = group_name
-        self._pins = {}
+        self._pins = {}  # Replaced by the _all_pins tuple on freeze()
+        self._all_pins = None
     
     def add_pin(self, name, pin):
         """Add a pin to this group"""
+        if self._pins is None:
+            raise RuntimeError(f"'{self._group_name}' group is frozen")
+        if hasattr(type(self), name) or name in self.__dict__:
+            raise ValueError(f"'{self._group_name}' group cannot use pin name '{name}'")
         self._pins[name] = pin
+        # Bind as a real attribute so lookups skip __getattr__
+        setattr(self, name, pin)
         
-        # Register for polling if needed
-        if isinstance(pin, EdgeTriggerPin) and not pin._use_irq:
-            self._board_io.add_monitored_pin(pin)
+        # Hook up IRQ dispatch or register for polling
+        if isinstance(pin, EdgeTriggerPin):
+            if pin._use_irq:
+                self._board_io.register_irq_pin(pin)
+            else:
+                self._board_io.add_monitored_pin(pin)
         
         return pin
     
     def __getattr__(self, name):
-        """Handle attribute access for pins in this group"""
-        if name in self._pins:
-            return self._pins[name]
+        """Fallback for names not bound by add_pin"""
+        pins = self._pins
+        if pins and name in pins:
+            return pins[name]
         raise AttributeError(f"'{self._group_name}' group has no pin named '{name}'")
     
     def get_all_pins(self):
         """Return all pins in this group"""
+        if self._all_pins is not None:
+            return self._all_pins
         return self._pins.values()
+    
+    def freeze(self):
+        """
+        Snapshot the pins into a tuple and drop the name dict.
+        Pins stay reachable as attributes; no pins can be added afterwards.
+        """
+        if self._pins is None:
+            return
+        self._all_pins = tuple(self._pins.values())
+        self._pins = None
 
 class BoardIO:
     """
     Manages I/O pins with edge detection capabilities.
     Organizes pins into logical groups.
     """
-    # Static set for callbacks from IRQs
-    _pending_callbacks = set()
-    
-    @staticmethod
-    def schedule_callback(pin):
-        """Schedule a pin for processing outside ISR"""
-        BoardIO._pending_callbacks.add(pin)
-    
-    @staticmethod
-    def process_pending_callbacks():
-        """Process any callbacks that were scheduled by IRQs"""
-        pending = list(BoardIO._pending_callbacks)
-        BoardIO._pending_callbacks.clear()
-        
-        for pin in pending:
-            if pin._latched_value is not None:
-                latched = pin._latched_value
-                pin._latched_value = None
-                
-                current_value = pin.value()
-                if current_value == latched and current_value != pin._last_value:
-                    current_time = utime.ticks_ms()
-                    if pin._debounce_ms == 0 or utime.ticks_diff(current_time, pin._last_trigger_time) >= pin._debounce_ms:
-                        edge_type = pin.EDGE_RISING if current_value else pin.EDGE_FALLING
-                        for callback in pin._callbacks[edge_type]:
-                            callback(pin)
-                        pin._last_trigger_time = current_time
-                        pin._last_value = current_value
-    
     def __init__(self):
         """Initialize an empty BoardIO instance with pin groups"""
         self._monitored_pins = []
+        self._watch_tasks = {}
+        # Wakes monitor_edges when a polled pin is registered
+        self._work_event = asyncio.Event()
         self._groups = {}
         
+        # Ring buffer of pin ids queued by IRQ handlers; preallocated so the ISR never allocates.
+        # Head/tail live in a bytearray so the viper enqueue can update them through ptr8.
+        self._pending = bytearray(_PENDING_MASK + 1)
+        self._ring_idx = bytearray(2)
+        self._pins_by_id = []
+        self._drain_scheduled = False
+        # Bound once so the ISR can pass it to micropython.schedule without allocating
+        self._drain_ref = self.process_pending_callbacks
+        
         # Create standard pin groups
         self.INPUT = self.create_group('INPUT')
         self.OUTPUT = self.create_group('OUTPUT')
         self.ANALOG = self.create_group('ANALOG')
         # Add more standard groups as needed
     
+    def register_irq_pin(self, pin):
+        """Assign an IRQ pin its ring buffer id and hand it the bound enqueue method"""
+        pin._id = len(self._pins_by_id)
+        self._pins_by_id.append(pin)
+        pin._sched = self._schedule
+        pin._update_irq()  # Arm for any callbacks registered before the pin was added
+    
+    @micropython.viper
+    def _schedule(self, pin_id: int):
+        """Queue a pin id from an ISR and schedule a single drain outside it"""
+        idx = ptr8(self._ring_idx)
+        tail = idx[_TAIL]
+        ptr8(self._pending)[tail] = pin_id
+        idx[_TAIL] = (tail + 1) & _PENDING_MASK
+        if not self._drain_scheduled:
+            self._drain_scheduled = True
+            micropython.schedule(self._drain_ref, 0)
+    
+    @micropython.native
+    def process_pending_callbacks(self, _=None):
+        """Process any callbacks that were queued by IRQs; runs via micropython.schedule"""
+        self._drain_scheduled = False
+        idx = self._ring_idx
+        head = idx[_HEAD]
+        if head == idx[_TAIL]:
+            return
+        pending = self._pending
+        pins = self._pins_by_id
+        while head != idx[_TAIL]:
+            pin = pins[pending[head]]
+            head = (head + 1) & _PENDING_MASK
+            idx[_HEAD] = head
+            pin._deferred()
+    
     def create_group(self, group_name):
         """Create a new pin group"""
         group = PinGroup(self, group_name)
         self._groups[group_name] = group
         return group
     
+    def settle(self, ms=5):
+        """
+        Wait once for pull resistors to settle, then resample the starting level of every edge pin.
+        Call after all pins are added instead of delaying each pin's construction.
+        """
+        _sleep_ms(ms)
+        for group in self._groups.values():
+            for pin in group.get_all_pins():
+                if isinstance(pin, EdgeTriggerPin):
+                    pin._last_raw = pin._raw()
+    
+    def finalize(self):
+        """Freeze all pin groups once setup is complete"""
+        for group in self._groups.values():
+            group.freeze()
+    
     def add_monitored_pin(self, pin):
         """Add a pin to the edge monitoring list (for polling mode)"""
         if pin not in self._monitored_pins and not pin._use_irq:
             self._monitored_pins.append(pin)
+            self._work_event.set()
     
     def remove_monitored_pin(self, pin):
         """Remove a pin from the edge monitoring list"""
         if pin in self._monitored_pins:
             self._monitored_pins.remove(pin)
+        task = self._watch_tasks.pop(pin, None)
+        if task is not None:
+            task.cancel()
     
-    async def monitor_edges(self):
-        """Background task to monitor edges on all registered pins and process IRQ callbacks"""
-        while True:
-            # Process IRQ callbacks first
-            BoardIO.process_pending_callbacks()
-            
-            # Handle polling pins directly
-            for pin in self._monitored_pins:
+    def _start_watch(self, pin):
+        """Start the watcher task for a polled pin"""
+        if pin not in self._watch_tasks:
+            self._watch_tasks[pin] = asyncio.create_task(self._watch_pin(pin))
+    
+    async def _watch_pin(self, pin):
+        """
+        Sleep until the pin's wake IRQ fires, then read and dispatch in task context.
+        The IRQ is held only while the watcher runs.
+        """
+        flag = pin._wake_flag
+        pin.irq(trigger=_IRQ_RISING | _IRQ_FALLING, handler=pin._wake_handler, hard=True)
+        flag.set()  # Catch a change made before the IRQ was armed
+        try:
+            while True:
+                await flag.wait()
                 pin._poll_handler()
-                    
-            await asyncio.sleep_ms(10)  # Poll interval
+                while pin._raw() != pin._last_raw:
+                    # Edge rejected by debounce; no further IRQ may come, so retry after the window
+                    await asyncio.sleep_ms(pin._debounce_ms)
+                    pin._poll_handler()
+        finally:
+            pin.irq(handler=None)
+    
+    async def monitor_edges(self):
+        """
+        Background task that starts a watcher for each polled pin as it is registered.
+        Watchers sleep until their pin's wake IRQ fires and IRQ pins dispatch via micropython.schedule,
+        so the only timed wakeups are debounce retries after a rejected edge.
+        """
+        try:
+            while True:
+                for pin in self._monitored_pins:
+                    self._start_watch(pin)
+                await self._work_event.wait()
+                self._work_event.clear()
+        finally:
+            for task in self._watch_tasks.values():
+                task.cancel()
+            self._watch_tasks.clear()
 
 
 
@@ -14,10 +14,14 @@ board_io.OUTPUT.add_pin('led', machine.Pin('LED', machine.Pin.OUT))
 board_io.INPUT.add_pin('button', EdgeTriggerPin(15, machine.Pin.IN, machine.Pin.PULL_UP, 
                        inverted=True, debounce_ms=50, use_irq=True))
                  
-# Example of a button using polling-based edge detection
+# Example of a button whose callbacks run in a BoardIO watcher task
 board_io.INPUT.add_pin('button2', EdgeTriggerPin(14, machine.Pin.IN, machine.Pin.PULL_UP,
                        inverted=True, debounce_ms=50, use_irq=False))
 
+# All pins are registered; let them settle once, then freeze the groups
+board_io.settle()
+board_io.finalize()
+
 # Use a single variable for the current period instead of an index into a list
 period_initial = 1000
 current_period = period_initial
@@ -30,23 +34,28 @@ async def toggle_led(led_builtin, time_ms):
     - -1: LED always OFF
     - Positive values: Normal blinking with that period
     """
-    while True:
-        # Handle special period values
-        if time_ms == 0:
-            # Always ON
-            led_builtin.on()
-        elif time_ms == -1:
-            # Always OFF
-            led_builtin.off()
-        else:
-            # Normal blinking
-            led_builtin.toggle()
+    # The period is fixed for the task's lifetime, so resolve it once up front
+    if time_ms == 0:
+        # Always ON
+        led_builtin.on()
+        await asyncio.Event().wait()
+        return
+    if time_ms == -1:
+        # Always OFF
+        led_builtin.off()
+        await asyncio.Event().wait()
+        return
 
-        await asyncio.sleep_ms(abs(time_ms) if time_ms < 7  else 50)  # Use absolute value, treat 0 as 50ms wait
+    # Normal blinking
+    toggle = led_builtin.toggle
+    delay = abs(time_ms)
+    while True:
+        toggle()
+        await asyncio.sleep_ms(delay)
 
 async def main_loop():
     print("Entering main loop...")    
-    task_handles = []  
+    task_handles = []  # Long-lived tasks; led_strobe_task is tracked on its own
     
     # Start edge monitoring task (this needs to run throughout)
     edge_monitor_task = asyncio.create_task(board_io.monitor_edges())
@@ -54,72 +63,80 @@ async def main_loop():
     
     # Initially start the LED toggling task with current period
     led_strobe_task = asyncio.create_task(toggle_led(board_io.OUTPUT.led, current_period))
-    task_handles.append(led_strobe_task)
     blinker_running = True
     
     # Create an event for program termination
     stop_event = asyncio.Event()
     
-    # Button press callback function to stop/start LED blinker
-    def on_button_press(pin):
-        nonlocal led_strobe_task, blinker_running, task_handles
+    # Button callbacks run in micropython.schedule context, so they only set a flag;
+    # the handler coroutines below do the state changes on the event loop
+    button_flag = asyncio.ThreadSafeFlag()
+    button2_flag = asyncio.ThreadSafeFlag()
+    
+    # Button press handler to stop/start LED blinker
+    async def handle_button():
+        nonlocal led_strobe_task, blinker_running
         
-        if blinker_running:
-            # Stop the LED blinker task
-            print("Stopping LED blinker")
-            led_strobe_task.cancel()
-            task_handles.remove(led_strobe_task)
-            board_io.OUTPUT.led.off()  # Ensure LED is off when stopped
-            blinker_running = False
-        else:
-            # Start a new LED blinker task with current period
-            print(f"Starting LED blinker (period: {current_period}ms)")
-            led_strobe_task = asyncio.create_task(toggle_led(board_io.OUTPUT.led, current_period))
-            task_handles.append(led_strobe_task)
-            blinker_running = True
+        while True:
+            await button_flag.wait()
+            
+            if blinker_running:
+                # Stop the LED blinker task
+                print("Stopping LED blinker")
+                led_strobe_task.cancel()
+                board_io.OUTPUT.led.off()  # Ensure LED is off when stopped
+                blinker_running = False
+            else:
+                # Start a new LED blinker task with current period
+                print(f"Starting LED blinker (period: {current_period}ms)")
+                led_strobe_task = asyncio.create_task(toggle_led(board_io.OUTPUT.led, current_period))
+                blinker_running = True
     
     # Register button press callback
-    board_io.INPUT.button.add_callback(EdgeTriggerPin.EDGE_RISING, on_button_press)
+    board_io.INPUT.button.add_callback(EdgeTriggerPin.EDGE_RISING, lambda pin: button_flag.set())
+    task_handles.append(asyncio.create_task(handle_button()))
     
-    # Button2 callback to cycle through blink periods with mathematical calculations
-    def on_button2_press(pin):
+    # Button2 handler to cycle through blink periods with mathematical calculations
+    async def handle_button2():
         global current_period
-        nonlocal led_strobe_task, blinker_running, task_handles
-        
-        # Calculate next period based on simple division
-        if current_period == -1:
-            # When LED is off, reset to initial period
-            current_period = period_initial
-        elif current_period == 0:
-            # When LED is fully on, turn it off
-            current_period = -1
-        else:
-            # Otherwise halve the period, rounding down
-            current_period = current_period // 2
-            ## If period becomes too small, set to always on
-            if current_period < 7:  # Minimum threshold
-                current_period = 0
-        
-        # Display the appropriate message based on period value
-        if current_period == 0:
-            print("Blink mode: Always ON")
-        elif current_period == -1:
-            print("Blink mode: Always OFF")
-        else:
-            print(f"Blink period changed to {current_period}ms")
+        nonlocal led_strobe_task, blinker_running
         
-        # If blinker is running, restart it with new period
-        if blinker_running:
-            # Stop the current task
-            led_strobe_task.cancel()
-            task_handles.remove(led_strobe_task)
+        while True:
+            await button2_flag.wait()
+            
+            # Calculate next period based on simple division
+            if current_period == -1:
+                # When LED is off, reset to initial period
+                current_period = period_initial
+            elif current_period == 0:
+                # When LED is fully on, turn it off
+                current_period = -1
+            else:
+                # Otherwise halve the period, rounding down
+                current_period = current_period // 2
+                ## If period becomes too small, set to always on
+                if current_period < 7:  # Minimum threshold
+                    current_period = 0
+            
+            # Display the appropriate message based on period value
+            if current_period == 0:
+                print("Blink mode: Always ON")
+            elif current_period == -1:
+                print("Blink mode: Always OFF")
+            else:
+                print(f"Blink period changed to {current_period}ms")
             
-            # Start a new task with the updated period
-            led_strobe_task = asyncio.create_task(toggle_led(board_io.OUTPUT.led, current_period))
-            task_handles.append(led_strobe_task)
+            # If blinker is running, restart it with new period
+            if blinker_running:
+                # Stop the current task
+                led_strobe_task.cancel()
+                
+                # Start a new task with the updated period
+                led_strobe_task = asyncio.create_task(toggle_led(board_io.OUTPUT.led, current_period))
     
     # Register button2 for period cycling
-    board_io.INPUT.button2.add_callback(EdgeTriggerPin.EDGE_RISING, on_button2_press)
+    board_io.INPUT.button2.add_callback(EdgeTriggerPin.EDGE_RISING, lambda pin: button2_flag.set())
+    task_handles.append(asyncio.create_task(handle_button2()))
 
     try:
         # Wait indefinitely (until KeyboardInterrupt)
@@ -127,7 +144,8 @@ async def main_loop():
     except asyncio.CancelledError:
         pass
     finally:
-        # Clean up all running tasks
+        # Clean up all running tasks, including the current LED task
+        task_handles.append(led_strobe_task)
         for task in task_handles:
             task.cancel()
 
@@ -1,6 +1,6 @@
 import network
 import uasyncio as asyncio
-from machine import Pin
+from machine import Pin, SPI
 import time
 
 # Import the web framework (contents of web.txt)
@@ -9,7 +9,16 @@ from hashlib import sha1
 from binascii import b2a_base64
 import struct
 
+# Hex digit -> nibble value, built once for percent-decoding
+_HEX = {}
+for _i, _c in enumerate('0123456789abcdef'):
+    _HEX[_c] = _i
+    _HEX[_c.upper()] = _i
+
 def unquote_plus(s):
+    # Most query strings have no escapes; skip the decode loop entirely
+    if '%' not in s:
+        return s.replace('+', ' ') if '+' in s else s
     out = []
     i = 0
     n = len(s)
@@ -19,7 +28,7 @@ def unquote_plus(s):
         if c == '+':
             out.append(' ')
         elif c == '%':
-            out.append(chr(int(s[i:i + 2], 16)))
+            out.append(chr((_HEX[s[i]] << 4) | _HEX[s[i + 1]]))
             i += 2
         else:
             out.append(c)
@@ -27,35 +36,33 @@ def unquote_plus(s):
 
 def parse_qs(s):
     out = {}
+    if not s:
+        return out
     for x in s.split('&'):
         kv = x.split('=', 1)
         key = unquote_plus(kv[0])
-        kv[0] = key
         if len(kv) == 1:
             val = True
-            kv.append(val)
         else:
             val = unquote_plus(kv[1])
-            kv[1] = val
-        tmp = out.get(key, None)
-        if tmp is None:
+        prev = out.get(key)
+        if prev is None:
             out[key] = val
+        elif isinstance(prev, list):
+            prev.append(val)
         else:
-            if isinstance(tmp, list):
-                tmp.append(val)
-            else:
-                out[key] = [tmp, val]
+            out[key] = [prev, val]
     return out
 
 async def _parse_request(r, w):
     line = await r.readline()
     if not line:
         raise ValueError
-    parts = line.decode().split()
+    parts = line.split()
     if len(parts) < 3:
         raise ValueError
-    r.method = parts[0]
-    r.path = parts[1]
+    r.method = parts[0].decode()
+    r.path = parts[1].decode()
     parts = r.path.split('?', 1)
     if len(parts) < 2:
         r.query = None
@@ -68,24 +75,37 @@ async def _parse_headers(r):
     headers = {}
     while True:
         line = await r.readline()
-        if not line:
+        if not line or line == b'\r\n':
             break
-        line = line.decode()
-        if line == '\r\n':
-            break
-        key, value = line.split(':', 1)
-        headers[key.lower()] = value.strip()
+        # Split and normalise on the raw bytes; only the key and value get decoded
+        i = line.index(b':')
+        headers[line[:i].lower().decode()] = line[i + 1:].strip().decode()
     return headers
 
+def _unmask(data, mask):
+    # XOR the whole payload against the repeated mask as one wide integer,
+    # so the work stays in C instead of a per-byte Python loop
+    n = len(data)
+    if not n:
+        return data
+    key = (mask * ((n >> 2) + 1))[:n]
+    return (int.from_bytes(data, 'little') ^ int.from_bytes(key, 'little')).to_bytes(n, 'little')
+
+async def _send_all(w, *chunks):
+    # One write per response keeps short replies in a single TCP segment
+    w.write(b''.join(chunks))
+    await w.drain()
+
 class App:
     def __init__(self, host='0.0.0.0', port=80):
         self.host = host
         self.port = port
-        self.handlers = []
+        self.routes = {}  # (method, path) -> handler
 
     def route(self, path, methods=['GET']):
         def wrapper(handler):
-            self.handlers.append((path, methods, handler))
+            for m in methods:
+                self.routes[(m, path)] = handler
             return handler
         return wrapper
 
@@ -95,11 +115,8 @@ class App:
         except:
             await w.wait_closed()
             return
-        for path, methods, handler in self.handlers:
-            if r.path != path:
-                continue
-            if r.method not in methods:
-                continue
+        handler = self.routes.get((r.method, r.path))
+        if handler is not None:
             await handler(r, w)
             await w.wait_closed()
             return
@@ -109,6 +126,11 @@ class App:
     async def serve(self):
         await asyncio.start_server(self._dispatch, self.host, self.port)
 
+_HS_PREFIX = (b'HTTP/1.1 101 Switching Protocols\r\n'
+              b'Upgrade: websocket\r\n'
+              b'Connection: Upgrade\r\n'
+              b'Sec-WebSocket-Accept: ')
+
 class WebSocket:
     HANDSHAKE_KEY = b'258EAFA5-E914-47DA-95CA-C5AB0DC85B11'
     OP_TYPES = {
@@ -122,14 +144,10 @@ class WebSocket:
 
     @classmethod
     async def upgrade(cls, r, w):
-        key = r.headers['sec-websocket-key'].encode()
-        key += WebSocket.HANDSHAKE_KEY
-        x = b2a_base64(sha1(key).digest()).strip()
-        w.write(b'HTTP/1.1 101 Switching Protocols\r\n')
-        w.write(b'Upgrade: websocket\r\n')
-        w.write(b'Connection: Upgrade\r\n')
-        w.write(b'Sec-WebSocket-Accept: ' + x + b'\r\n')
-        w.write(b'\r\n')
+        h = sha1(r.headers['sec-websocket-key'].encode())
+        h.update(WebSocket.HANDSHAKE_KEY)
+        x = b2a_base64(h.digest()).strip()
+        w.write(_HS_PREFIX + x + b'\r\n\r\n')
         await w.drain()
         return cls(r, w)
 
@@ -159,10 +177,7 @@ class WebSocket:
             mask = await r.read(4)
         data = await r.read(n)
         if masked:
-            data = bytearray(data)
-            for i in range(len(data)):
-                data[i] ^= mask[i % 4]
-            data = bytes(data)
+            data = _unmask(data, mask)
         if out['type'] == 'text':
             data = data.decode()
         out['data'] = data
@@ -175,28 +190,26 @@ class WebSocket:
             await self._send_op(0x2, msg)
 
     async def _send_op(self, opcode, payload):
-        w = self.w
-        w.write(bytes([0x80 | opcode]))
         n = len(payload)
+        h = 0x80 | opcode
+        # Build the whole frame header in one object; small frames need no struct.pack
         if n < 126:
-            w.write(bytes([n]))
+            header = bytes((h, n))
         elif n < 65536:
-            w.write(struct.pack('!BH', 126, n))
+            header = struct.pack('!BBH', h, 126, n)
         else:
-            w.write(struct.pack('!BQ', 127, n))
-        w.write(payload)
-        await w.drain()
+            header = struct.pack('!BBQ', h, 127, n)
+        await _send_all(self.w, header, payload)
 
 class EventSource:
     @classmethod
     async def upgrade(cls, r, w):
-        w.write(b'HTTP/1.0 200 OK\r\n')
-        w.write(b'Content-Type: text/event-stream\r\n')
-        w.write(b'Cache-Control: no-cache\r\n')
-        w.write(b'Connection: keep-alive\r\n')
-        w.write(b'Access-Control-Allow-Origin: *\r\n')
-        w.write(b'\r\n')
-        await w.drain()
+        await _send_all(w, b'HTTP/1.0 200 OK\r\n'
+                           b'Content-Type: text/event-stream\r\n'
+                           b'Cache-Control: no-cache\r\n'
+                           b'Connection: keep-alive\r\n'
+                           b'Access-Control-Allow-Origin: *\r\n'
+                           b'\r\n')
         return cls(r, w)
 
     def __init__(self, r, w):
@@ -204,14 +217,13 @@ class EventSource:
         self.w = w
 
     async def send(self, msg, id=None, event=None):
-        w = self.w
+        chunks = []
         if id is not None:
-            w.write(b'id: {}\r\n'.format(id))
+            chunks.append(b'id: {}\r\n'.format(id))
         if event is not None:
-            w.write(b'event: {}\r\n'.format(event))
-        w.write(b'data: {}\r\n'.format(msg))
-        w.write(b'\r\n')
-        await w.drain()
+            chunks.append(b'event: {}\r\n'.format(event))
+        chunks.append(b'data: {}\r\n\r\n'.format(msg))
+        await _send_all(self.w, *chunks)
 
 # --- Main Hydraulic Press Control System ---
 
@@ -234,6 +246,16 @@ RELAY_13MB2 = Pin(19, Pin.OUT)      # Relay 6: Move Up
 RELAY_RESERVE1 = Pin(17, Pin.OUT)   # Relay 7: Reserve
 RELAY_RESERVE2 = Pin(16, Pin.OUT)   # Relay 8: Reserve
 
+RELAYS = (RELAY_MOTOR, RELAY_DOOR, RELAY_12MB1, RELAY_12MB2,
+          RELAY_13MB1, RELAY_13MB2, RELAY_RESERVE1, RELAY_RESERVE2)
+
+# Bound methods resolved once for the relay helpers below
+_RELAY_OFF = tuple(r.off for r in RELAYS)
+_12mb1_on, _12mb1_off = RELAY_12MB1.on, RELAY_12MB1.off
+_12mb2_on, _12mb2_off = RELAY_12MB2.on, RELAY_12MB2.off
+_13mb1_on, _13mb1_off = RELAY_13MB1.on, RELAY_13MB1.off
+_13mb2_on, _13mb2_off = RELAY_13MB2.on, RELAY_13MB2.off
+
 # Input Signals (Default Pull-up, configurable)
 # We'll store the configuration in a dictionary
 input_config = {
@@ -252,6 +274,9 @@ input_config = {
     'reserve5': {'pin': Pin(15, Pin.IN, Pin.PULL_UP), 'pull': 'up'},
 }
 
+# Set from pin IRQs on any input edge so system_task can sleep until there is work
+input_changed = asyncio.ThreadSafeFlag()
+
 # Status LED
 STATUS_LED = Pin(25, Pin.OUT)
 
@@ -263,26 +288,42 @@ LATCH_PIN = Pin(9, Pin.OUT)
 SEG8Code = [0x5F, 0x42, 0x9B, 0xD3, 0xC6, 0xD5, 0xDD, 0x43, 0xDF, 0xD7, 0xCF, 0xDC, 0x1D, 0xDA, 0x9D, 0x8D]
 BitsSelection = [0xFE, 0xFD, 0xFB, 0xF7]  # Digit selection (1st, 2nd, 3rd, 4th)
 
+# Character -> segment code for the display (digits from SEG8Code, letters simplified)
+CHAR_GLYPH = {' ': 0x00, 'I': 0x06, 'N': 0x76, 'T': 0x71, 'D': 0x5E, 'L': 0x38,
+              'E': 0x79, 'R': 0x5E, 'F': 0x71, 'U': 0x3F, 'P': 0x73}
+for _d in range(10):
+    CHAR_GLYPH[str(_d)] = SEG8Code[_d]
+
+# Four-character display text per state
+STATE_TEXT = {
+    'INIT': 'INIT',
+    'IDLE': ' IDL',
+    'ERROR': 'ERR ',
+    'FAST_DOWN': 'FDWN',
+    'MOVE_UP': ' UP ',
+    'PRESS_FULL': 'FULL'
+}
+
 class LED_8SEG:
     def __init__(self):
         self.latch = LATCH_PIN
-        self.clock = CLOCK_PIN
-        self.data = DATA_PIN
         self.latch.value(1)
-        self.clock.value(1)
-        self.data.value(1)
+        # GP10/GP11 are SPI1 SCK/TX. Clock idles high and the shift register
+        # samples on the rising edge, as with the old bit-banged sequence.
+        # No MISO, so the default SPI1 RX pin (GP8, reserve3) stays an input.
+        self.spi = SPI(1, baudrate=2_000_000, polarity=1, phase=1,
+                       sck=CLOCK_PIN, mosi=DATA_PIN, miso=None)
+        self._buf = bytearray(2)  # Reused for every digit write
         self.SEG8 = SEG8Code
 
     def Send_Bytes(self, dat):
-        for _ in range(8):
-            self.data.value(1 if dat & 0x80 else 0)
-            dat = dat << 1
-            self.clock.value(0)
-            self.clock.value(1)
+        self.spi.write(bytes((dat,)))
 
     def write_cmd(self, Num, Seg):
-        self.Send_Bytes(Num)
-        self.Send_Bytes(Seg)
+        buf = self._buf
+        buf[0] = Num
+        buf[1] = Seg
+        self.spi.write(buf)
         self.latch.value(0)
         self.latch.value(1)
 
@@ -307,7 +348,7 @@ class PressStateMachine:
             'fast_down': 0,
             'slow_down_transition': 0,
             'move_up_timeout': 0,
-            'full_press_timer': 0,
+            'full_press_timer': None,
             'cycle_timeout': 0
         }
 
@@ -322,32 +363,11 @@ class PressStateMachine:
             print(f"ERROR: Invalid state {new_state}")
 
     def update_display(self):
-        # Simple mapping for display
-        state_map = {
-            'INIT': 'INIT',
-            'IDLE': ' IDL',
-            'ERROR': 'ERR ',
-            'FAST_DOWN': 'FDWN',
-            'MOVE_UP': ' UP ',
-            'PRESS_FULL': 'FULL'
-        }
-        text = state_map.get(self.state, '    ')
-        # Convert text to display codes
-        digits = []
-        for char in text:
-            if char == ' ':
-                digits.append(0x00)  # Blank
-            elif char.isdigit():
-                digits.append(self.display.SEG8[int(char)])
-            else:
-                # Map letters (simplified)
-                letter_map = {'I': 0x06, 'N': 0x76, 'T': 0x71, 'D': 0x5E, 'L': 0x38, 'E': 0x79, 'R': 0x5E, 'F': 0x71, 'U': 0x3F, 'P': 0x73}
-                digits.append(letter_map.get(char, 0x00))
-
+        text = STATE_TEXT.get(self.state, '    ')
         # Update display (this is a simplified version)
         # In a real implementation, you'd create a task to refresh the display continuously
-        for i in range(min(4, len(digits))):
-            display.write_cmd(BitsSelection[i], digits[i] if i < len(digits) else 0x00)
+        for i in range(min(4, len(text))):
+            display.write_cmd(BitsSelection[i], CHAR_GLYPH.get(text[i], 0x00))
 
     def get_state(self):
         return self.state
@@ -368,6 +388,7 @@ def get_input_state(input_name):
 
 def set_input_pull(input_name, pull_type):
     """Reconfigure an input pin with pull-up or pull-down."""
+    global _config_json
     if pull_type not in ['up', 'down']:
         return False
     pin_num = input_config[input_name]['pin'].id()  # Get the pin number
@@ -377,63 +398,91 @@ def set_input_pull(input_name, pull_type):
     else:  # pull-down
         input_config[input_name]['pin'] = Pin(pin_num, Pin.IN, Pin.PULL_DOWN)
     input_config[input_name]['pull'] = pull_type
+    _config_json = None  # Rebuilt on the next /api/status request
+    arm_input_irq(input_name)  # The new Pin object has no IRQ yet
+    input_changed.set()  # Re-evaluate inputs; the pull change may not cause an edge
     return True
 
+def _on_input_irq(pin):
+    input_changed.set()
+
+def arm_input_irq(input_name):
+    """Wake system_task on either edge of an input."""
+    input_config[input_name]['pin'].irq(trigger=Pin.IRQ_FALLING | Pin.IRQ_RISING, handler=_on_input_irq)
+
+for _input_name in input_config:
+    arm_input_irq(_input_name)
+
 def stop_all_relays():
     """Emergency stop: turn off all relays."""
-    RELAY_MOTOR.value(0)
-    RELAY_DOOR.value(0)
-    RELAY_12MB1.value(0)
-    RELAY_12MB2.value(0)
-    RELAY_13MB1.value(0)
-    RELAY_13MB2.value(0)
-    RELAY_RESERVE1.value(0)
-    RELAY_RESERVE2.value(0)
+    for off in _RELAY_OFF:
+        off()
 
 def move_fast_down():
     """Activate fast downward movement."""
-    RELAY_12MB1.value(1)
-    RELAY_12MB2.value(0)
-    RELAY_13MB1.value(0)
-    RELAY_13MB2.value(0)
+    _12mb1_on()
+    _12mb2_off()
+    _13mb1_off()
+    _13mb2_off()
 
 def move_slow_down_high_force():
     """Activate slow downward movement with high force."""
-    RELAY_12MB1.value(1)
-    RELAY_12MB2.value(0)
-    RELAY_13MB1.value(1)
-    RELAY_13MB2.value(0)
+    _12mb1_on()
+    _12mb2_off()
+    _13mb1_on()
+    _13mb2_off()
 
 def move_up():
     """Activate upward movement."""
-    RELAY_12MB1.value(0)
-    RELAY_12MB2.value(1)
-    RELAY_13MB1.value(0)
-    RELAY_13MB2.value(1)
+    _12mb1_off()
+    _12mb2_on()
+    _13mb1_off()
+    _13mb2_on()
 
 # --- Web Interface Handlers ---
 
-@app.route('/')
-async def index_handler(r, w):
-    """Main control page."""
-    try:
-        # Read HTML content from external file
-        with open('index.html', 'r') as f:
-            html = f.read()
-    except OSError:
-        # Fallback error message if file can't be read
-        html = """<!DOCTYPE html>
+# Main page, loaded once at boot
+try:
+    # Read HTML content from external file
+    with open('index.html', 'rb') as f:
+        _INDEX_HTML = f.read()
+except OSError:
+    # Fallback error message if file can't be read
+    _INDEX_HTML = b"""<!DOCTYPE html>
 <html>
 <head><title>Error</title></head>
 <body><h1>Error: Unable to load index.html</h1></body>
 </html>"""
-    
-    w.write(b'HTTP/1.0 200 OK\r\n')
-    w.write(b'Content-Type: text/html; charset=utf-8\r\n')
-    w.write(b'\r\n')
-    w.write(html.encode())
+_INDEX_HEADER = (b'HTTP/1.0 200 OK\r\n'
+                 b'Content-Type: text/html; charset=utf-8\r\n'
+                 b'Content-Length: ' + str(len(_INDEX_HTML)).encode() + b'\r\n\r\n')
+
+@app.route('/')
+async def index_handler(r, w):
+    """Main control page."""
+    # Two writes so the page itself is never copied into a joined buffer
+    w.write(_INDEX_HEADER)
+    w.write(_INDEX_HTML)
     await w.drain()
 
+# Serialised input_config pulls for /api/status; only changes through set_input_pull
+_config_json = None
+
+def _status_config_json():
+    global _config_json
+    if _config_json is None:
+        import json
+        _config_json = json.dumps({
+            'start_btn': input_config['start_btn']['pull'],
+            'manual_up_btn': input_config['manual_up_btn']['pull'],
+            'manual_down_btn': input_config['manual_down_btn']['pull'],
+            'emergency_stop_btn': input_config['emergency_stop_btn']['pull'],
+            'press_top_sensor': input_config['press_top_sensor']['pull'],
+            'press_bottom_sensor': input_config['press_bottom_sensor']['pull'],
+            'door_open_sensor': input_config['door_open_sensor']['pull']
+        }).encode()
+    return _config_json
+
 @app.route('/api/status')
 async def status_handler(r, w):
     """API endpoint to get current system status."""
@@ -456,34 +505,29 @@ async def status_handler(r, w):
             'press_top_sensor': get_input_state('press_top_sensor'),
             'press_bottom_sensor': get_input_state('press_bottom_sensor'),
             'door_open_sensor': get_input_state('door_open_sensor')
-        },
-        'input_config': {
-            'start_btn': input_config['start_btn']['pull'],
-            'manual_up_btn': input_config['manual_up_btn']['pull'],
-            'manual_down_btn': input_config['manual_down_btn']['pull'],
-            'emergency_stop_btn': input_config['emergency_stop_btn']['pull'],
-            'press_top_sensor': input_config['press_top_sensor']['pull'],
-            'press_bottom_sensor': input_config['press_bottom_sensor']['pull'],
-            'door_open_sensor': input_config['door_open_sensor']['pull']
         }
     }
     
     import json
-    json_str = json.dumps(status_data)
+    json_str = json.dumps(status_data).encode()
     
-    w.write(b'HTTP/1.0 200 OK\r\n')
-    w.write(b'Content-Type: application/json\r\n')
-    w.write(b'\r\n')
-    w.write(json_str.encode())
-    await w.drain()
+    # Splice the cached input_config object in before the closing brace
+    await _send_all(w, b'HTTP/1.0 200 OK\r\nContent-Type: application/json\r\n\r\n',
+                    json_str[:-1], b', "input_config": ', _status_config_json(), b'}')
+
+# Largest request body accepted by POST handlers
+_MAX_BODY = 1024
 
 @app.route('/api/config', methods=['POST'])
 async def config_handler(r, w):
     """API endpoint to update input configuration."""
     try:
-        # Read the request body
+        # Read the request body, refusing anything larger than we are willing to buffer
         content_length = int(r.headers.get('content-length', 0))
-        body = await r.read(content_length)
+        if content_length > _MAX_BODY:
+            await _send_all(w, b'HTTP/1.0 413 Payload Too Large\r\n\r\n')
+            return
+        body = await r.readexactly(max(content_length, 0))
         import json
         config_data = json.loads(body.decode())
         
@@ -495,31 +539,34 @@ async def config_handler(r, w):
                     success = False
         
         if success:
-            w.write(b'HTTP/1.0 200 OK\r\n')
-            w.write(b'Content-Type: application/json\r\n')
-            w.write(b'\r\n')
-            w.write(b'{"status": "success"}')
+            response = (b'HTTP/1.0 200 OK\r\n'
+                        b'Content-Type: application/json\r\n\r\n'
+                        b'{"status": "success"}')
         else:
-            w.write(b'HTTP/1.0 400 Bad Request\r\n')
-            w.write(b'Content-Type: application/json\r\n')
-            w.write(b'\r\n')
-            w.write(b'{"status": "error", "message": "Invalid configuration"}')
+            response = (b'HTTP/1.0 400 Bad Request\r\n'
+                        b'Content-Type: application/json\r\n\r\n'
+                        b'{"status": "error", "message": "Invalid configuration"}')
     except Exception as e:
-        w.write(b'HTTP/1.0 500 Internal Server Error\r\n')
-        w.write(b'Content-Type: application/json\r\n')
-        w.write(b'\r\n')
-        w.write(b'{"status": "error", "message": "Server error"}')
+        response = (b'HTTP/1.0 500 Internal Server Error\r\n'
+                    b'Content-Type: application/json\r\n\r\n'
+                    b'{"status": "error", "message": "Server error"}')
         print(f"Config handler error: {e}")
     
-    await w.drain()
+    await _send_all(w, response)
 
 # --- Main System Task ---
+
+# States that wait on a timer as well as inputs, so they still need a periodic wakeup
+TIMED_STATES = ('MOTOR_WARMUP', 'MOVE_UP', 'FAST_DOWN', 'SLOW_DOWN_HIGH_FORCE')
+
 async def system_task():
     """Main system control task implementing the finite state machine."""
     global state_machine
     
     while True:
         current_state = state_machine.get_state()
+        # One clock read per pass; timers hold absolute ticks_ms deadlines
+        now = time.ticks_ms()
         
         try:
             if current_state == 'INIT':
@@ -543,7 +590,7 @@ async def system_task():
                 # Wait for start button
                 if get_input_state('start_btn') and not get_input_state('emergency_stop_btn'):
                     RELAY_MOTOR.value(1)  # Start motor
-                    state_machine.timers['motor_warmup'] = time.time() + 5  # 5 seconds warmup
+                    state_machine.timers['motor_warmup'] = time.ticks_add(now, 5000)  # 5 seconds warmup
                     state_machine.set_state('MOTOR_WARMUP')
                     
                 # Check manual controls
@@ -554,25 +601,25 @@ async def system_task():
                     
             elif current_state == 'MOTOR_WARMUP':
                 # Wait for motor warmup
-                if time.time() >= state_machine.timers['motor_warmup']:
+                if time.ticks_diff(now, state_machine.timers['motor_warmup']) >= 0:
                     move_up()  # Move to top position
-                    state_machine.timers['move_up_timeout'] = time.time() + 15  # 15 seconds timeout
+                    state_machine.timers['move_up_timeout'] = time.ticks_add(now, 15000)  # 15 seconds timeout
                     state_machine.set_state('MOVE_UP')
                     
             elif current_state == 'MOVE_UP':
                 # Wait for top position sensor
                 if get_input_state('press_top_sensor'):
                     state_machine.set_state('WAIT_FOR_FILL')
-                elif time.time() >= state_machine.timers['move_up_timeout']:
+                elif time.ticks_diff(now, state_machine.timers['move_up_timeout']) >= 0:
                     state_machine.error_code = "MOVE_UP_TIMEOUT"
                     state_machine.set_state('ERROR')
                     
             elif current_state == 'WAIT_FOR_FILL':
                 # Wait for door to close and start cycle
                 if not get_input_state('door_open_sensor') and get_input_state('start_btn'):
-                    state_machine.timers['cycle_timeout'] = time.time() + 60  # 60 seconds for full cycle
+                    state_machine.timers['cycle_timeout'] = time.ticks_add(now, 60000)  # 60 seconds for full cycle
                     move_fast_down()
-                    state_machine.timers['fast_down'] = time.time() + 15  # 15 seconds fast down
+                    state_machine.timers['fast_down'] = time.ticks_add(now, 15000)  # 15 seconds fast down
                     state_machine.set_state('FAST_DOWN')
                     
             elif current_state == 'FAST_DOWN':
@@ -580,34 +627,34 @@ async def system_task():
                 if get_input_state('press_bottom_sensor'):
                     # Transition to slow down with high force
                     RELAY_12MB1.value(0)  # Turn off fast down
-                    state_machine.timers['slow_down_transition'] = time.time() + 2  # Wait 2 seconds
+                    state_machine.timers['slow_down_transition'] = time.ticks_add(now, 2000)  # Wait 2 seconds
                     state_machine.set_state('SLOW_DOWN_HIGH_FORCE')
-                elif time.time() >= state_machine.timers['fast_down']:
+                elif time.ticks_diff(now, state_machine.timers['fast_down']) >= 0:
                     # Timeout - transition to slow down anyway
                     RELAY_12MB1.value(0)
-                    state_machine.timers['slow_down_transition'] = time.time() + 2
+                    state_machine.timers['slow_down_transition'] = time.ticks_add(now, 2000)
                     state_machine.set_state('SLOW_DOWN_HIGH_FORCE')
                     
             elif current_state == 'SLOW_DOWN_HIGH_FORCE':
                 # Slow down with high force
-                if time.time() >= state_machine.timers['slow_down_transition']:
+                if time.ticks_diff(now, state_machine.timers['slow_down_transition']) >= 0:
                     # First, activate 13MB1 for 1 second
                     RELAY_13MB1.value(1)
-                    state_machine.timers['slow_down_transition'] = time.time() + 1
+                    state_machine.timers['slow_down_transition'] = time.ticks_add(now, 1000)
                     # Then reactivate 12MB1
                     RELAY_12MB1.value(1)
                     
                 # Check if we've reached bottom position for more than 10 seconds
                 if get_input_state('press_bottom_sensor'):
-                    if state_machine.timers['full_press_timer'] == 0:
-                        state_machine.timers['full_press_timer'] = time.time()
-                    elif time.time() - state_machine.timers['full_press_timer'] > 10:
+                    if state_machine.timers['full_press_timer'] is None:
+                        state_machine.timers['full_press_timer'] = now
+                    elif time.ticks_diff(now, state_machine.timers['full_press_timer']) > 10000:
                         state_machine.set_state('PRESS_FULL')
                 else:
-                    state_machine.timers['full_press_timer'] = 0  # Reset timer if not at bottom
+                    state_machine.timers['full_press_timer'] = None  # Reset timer if not at bottom
                     
                 # Check cycle timeout
-                if time.time() >= state_machine.timers['cycle_timeout']:
+                if time.ticks_diff(now, state_machine.timers['cycle_timeout']) >= 0:
                     state_machine.error_code = "CYCLE_TIMEOUT"
                     state_machine.set_state('ERROR')
                     
@@ -662,35 +709,41 @@ async def system_task():
             state_machine.error_code = "SYSTEM_ERROR"
             state_machine.set_state('ERROR')
         
-        # Small delay to prevent blocking
-        await asyncio.sleep(0.1)
+        # Sleep until an input changes; states with running timers also wake every 100 ms
+        if state_machine.get_state() != current_state:
+            await asyncio.sleep(0)  # Evaluate the new state right away
+        elif current_state in TIMED_STATES:
+            try:
+                await asyncio.wait_for_ms(input_changed.wait(), 100)
+            except asyncio.TimeoutError:
+                pass
+        else:
+            await input_changed.wait()
 
 # --- Display Update Task ---
+
+# State -> four digit glyphs, computed once instead of on every refresh
+_STATE_GLYPHS = {}
+for _num, _state in enumerate(PressStateMachine.STATES):
+    # Default: show state as number or code
+    _STATE_GLYPHS[_state] = tuple(SEG8Code[int(d)] for d in f"{_num:04d}")
+_STATE_GLYPHS['ERROR'] = (SEG8Code[0], SEG8Code[1], SEG8Code[1], SEG8Code[1])  # "Err"
+_STATE_GLYPHS['IDLE'] = (0x00, SEG8Code[0], SEG8Code[1], SEG8Code[2])  # " 012" - placeholder
+_STATE_GLYPHS['FAST_DOWN'] = (SEG8Code[0], SEG8Code[1], 0x00, 0x00)  # "01  " - placeholder
+
 async def display_task():
     """Task to continuously update the 7-segment display."""
     # This is a simplified version - in practice, you'd need to implement
     # proper multiplexing to avoid flickering
+    bits = BitsSelection
+    write_cmd = display.write_cmd
     while True:
         try:
-            # Get current state for display
-            state = state_machine.get_state()
-            
-            # Simple state to display mapping
-            if state == 'ERROR':
-                digits = [display.SEG8[0], display.SEG8[1], display.SEG8[1], display.SEG8[1]]  # "Err"
-            elif state == 'IDLE':
-                digits = [0x00, display.SEG8[0], display.SEG8[1], display.SEG8[2]]  # " 012" - placeholder
-            elif state == 'FAST_DOWN':
-                digits = [display.SEG8[0], display.SEG8[1], 0x00, 0x00]  # "01  " - placeholder
-            else:
-                # Default: show state as number or code
-                state_num = state_machine.STATES.index(state) % 10000
-                str_num = f"{state_num:04d}"
-                digits = [display.SEG8[int(d)] for d in str_num]
+            digits = _STATE_GLYPHS.get(state_machine.get_state(), (0x00, 0x00, 0x00, 0x00))
             
             # Update each digit (very simplified - would flicker in real use)
             for i in range(4):
-                display.write_cmd(BitsSelection[i], digits[i])
+                write_cmd(bits[i], digits[i])
                 await asyncio.sleep(0.001)  # Very short delay
                 
         except Exception as e: